@@ -87,6 +87,10 @@ class PageHinkley(StreamingDetector):
             raise ValueError("Page-Hinkley should only be used to monitor 1 variable.")
         super().update(X, None, None)
 
+        # track a plain float, so the statistics histories are lists of
+        # floats rather than of 1x1 arrays
+        X = float(X[0, 0])
+
         self._mean = self._mean + (X - self._mean) / self.samples_since_reset
         self._sum = self._sum + X - self._mean - self.delta
         theta = self.threshold * self._mean
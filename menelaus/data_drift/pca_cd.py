@@ -1,9 +1,6 @@
 import numpy as np
-import pandas as pd
-from scipy.spatial.distance import jensenshannon
-from sklearn.decomposition import PCA
 from sklearn.preprocessing import StandardScaler
-from sklearn.neighbors import KernelDensity
+from sklearn.utils.extmath import randomized_svd
 from menelaus.detector import StreamingDetector
 from menelaus.change_detection.page_hinkley import PageHinkley
 
@@ -46,6 +43,8 @@ class PCACD(StreamingDetector):
         divergence_metric="kl",
         sample_period=0.05,
         online_scaling=True,
+        dtype="float64",
+        device="cpu",
     ):
         """
         Args:
@@ -55,7 +54,8 @@ class PCACD(StreamingDetector):
                 is smaller.
             ev_threshold (float, optional): Threshold for percent explained
                 variance required when selecting number of principal components.
-                Defaults to 0.99.
+                If at least 1, the number of principal components to keep,
+                which may not exceed the number of features. Defaults to 0.99.
             delta (float, optional): Parameter for Page Hinkley test. Minimum
                 amplitude of change in data needed to sound alarm. Defaults to
                 0.1.
@@ -77,12 +77,33 @@ class PCACD(StreamingDetector):
             online_scaling (bool, optional): whether to standardize the data as
                 it comes in, using the reference window, before applying PCA.
                 Defaults to ``True``.
+            dtype (str or numpy.dtype, optional): floating point type of the
+                PCA projections. ``"float32"`` halves the memory traffic of the
+                streaming projection and density estimation, at the cost of
+                precision. The windows are always kept, centered and fit in
+                float64. Defaults to ``"float64"``.
+            device (str, optional): where to project the test window and
+                estimate densities, ``"cpu"`` or ``"cuda"``. ``"cuda"`` requires
+                ``cupy``, and only pays off for large windows with many
+                features (roughly ``window_size >= 10000`` and d >= 100). The
+                windows and principal components are always kept and fit on
+                the CPU. Defaults to ``"cpu"``.
         """
         super().__init__()
         self.window_size = window_size
         self.ev_threshold = ev_threshold
         self.divergence_metric = divergence_metric
         self.sample_period = sample_period
+        self.dtype = np.dtype(dtype)
+        self.device = device
+        if self.device == "cpu":
+            self._xp = np
+        elif self.device == "cuda":
+            import cupy
+
+            self._xp = cupy
+        else:
+            raise ValueError(f"device must be 'cpu' or 'cuda', got {device}")
 
         # Initialize parameters
         self.step = min(100, round(self.sample_period * window_size))
@@ -101,12 +122,18 @@ class PCACD(StreamingDetector):
             self._reference_scaler = StandardScaler()
 
         self._build_reference_and_test = True
-        self._reference_window = pd.DataFrame()
-        self._test_window = pd.DataFrame()
-        self._pca = None
-        self._reference_pca_projection = pd.DataFrame()
-        self._test_pca_projection = pd.DataFrame()
+        self._reference_window = None
+        self._test_window = None
+        self._reference_fill = 0
+        self._test_fill = 0
+        self._test_head = 0
+        self._pending_obs = []
+        self._pca_mean = None
+        self._pca_components_T = None
+        self._reference_pca_projection = None
+        self._test_pca_projection = None
         self._density_reference = {}
+        self._kernel_fft_cache = {}
         self._change_score = [0]
 
     def update(self, X, y_true=None, y_pred=None):
@@ -122,150 +149,182 @@ class PCACD(StreamingDetector):
 
         if self._build_reference_and_test:
             if self.drift_state is not None:
-                self._reference_window = self._test_window.copy()
-                if self.online_scaling is True:
-                    # we'll need to refit the scaler. this occurs when both
-                    # reference and test windows are full, so, inverse_transform
-                    # first, here
-                    self._reference_window = pd.DataFrame(
-                        self._reference_scaler.inverse_transform(self._reference_window)
-                    )
-                self._test_window = pd.DataFrame()
+                # unroll the test ring buffer so the oldest observation is
+                # first, then refill the test window in place
+                self._reference_window = np.roll(
+                    self._test_window, -self._test_head, axis=0
+                )
+                self._test_fill = 0
                 self.reset()
                 self._drift_detection_monitor.reset()
 
-            elif len(self._reference_window) < self.window_size:
-                self._reference_window = pd.concat(
-                    [self._reference_window, pd.DataFrame(X)]
-                )
+            elif self._reference_fill < self.window_size:
+                if self._reference_window is None:
+                    n_features = X.shape[1]
+                    self._reference_window = np.empty(
+                        (self.window_size, n_features), dtype=np.float64
+                    )
+                    self._test_window = np.empty(
+                        (self.window_size, n_features), dtype=np.float64
+                    )
+                self._reference_window[self._reference_fill] = X[0]
+                self._reference_fill += 1
 
-            elif len(self._test_window) < self.window_size:
-                self._test_window = pd.concat([self._test_window, pd.DataFrame(X)])
+            elif self._test_fill < self.window_size:
+                self._test_window[self._test_fill] = X[0]
+                self._test_fill += 1
 
-            if len(self._test_window) == self.window_size:
+            if self._test_fill == self.window_size:
                 self._build_reference_and_test = False
 
-                # Fit Reference window onto PCs
+                # Fit Reference window onto PCs. The windows hold unscaled
+                # observations; scaling is folded into the projection below.
+                reference = self._reference_window
                 if self.online_scaling is True:
-                    self._reference_window = pd.DataFrame(
-                        self._reference_scaler.fit_transform(self._reference_window)
-                    )
-                    self._test_window = pd.DataFrame(
-                        self._reference_scaler.transform(self._test_window)
-                    )
+                    self._reference_scaler.fit(reference)
+                    self._scaler_mean = self._reference_scaler.mean_.astype(np.float64)
+                    self._scaler_inv_scale = 1.0 / self._reference_scaler.scale_
+                    reference = (reference - self._scaler_mean) * self._scaler_inv_scale
 
                 # Compute principal components
-                self._pca = PCA(self.ev_threshold)
-                self._pca.fit(self._reference_window)
-                self.num_pcs = len(self._pca.components_)
+                self._fit_pca(reference)
+
+                # For an unscaled observation x, the projection
+                # ((x - scaler_mean) * scaler_inv_scale - pca_mean) @ components_T
+                # is computed as (x - mean) @ weights. Observations are centered
+                # in float64 before the cast to self.dtype, so that large means
+                # do not cancel after the product.
+                if self.online_scaling is True:
+                    weights = self._scaler_inv_scale[:, None] * self._pca_components_T
+                    mean = self._scaler_mean + self._pca_mean / self._scaler_inv_scale
+                else:
+                    weights = self._pca_components_T
+                    mean = self._pca_mean
+                self._projection_mean = mean
+
+                # Projections are stored with one row per PC, so that each
+                # PC's scores are contiguous for the per-PC density estimates
+                xp = self._xp
+                self._projection_weights = xp.asarray(
+                    np.ascontiguousarray(weights.T, dtype=self.dtype)
+                )
 
                 # Project reference window onto PCs
-                self._reference_pca_projection = pd.DataFrame(
-                    self._pca.transform(self._reference_window),
+                self._reference_pca_projection = self._projection_weights @ (
+                    xp.asarray((self._reference_window - mean).astype(self.dtype)).T
                 )
 
-                # Project test window onto PCs
-                self._test_pca_projection = pd.DataFrame(
-                    self._pca.transform(self._test_window),
+                # Project test window onto PCs. From here on, the test window and
+                # its projection are fixed-size ring buffers: each new
+                # observation overwrites the oldest one at self._test_head.
+                self._test_pca_projection = self._projection_weights @ (
+                    xp.asarray((self._test_window - mean).astype(self.dtype)).T
+                )
+                self._test_head = 0
+                self._pending_obs = []
+
+                # Scratch space for projecting pending observations, which
+                # number at most one step, or one window, between change scores
+                n_buffer = min(self.step, self.window_size)
+                n_features = self._test_window.shape[1]
+                self._pending_buffer = np.empty((n_buffer, n_features))
+                self._centered_buffer = np.empty(
+                    (n_buffer, n_features), dtype=self.dtype
+                )
+                # Flat, so that the projections of any number of pending
+                # observations can be written to a contiguous view of it
+                self._projection_buffer = xp.empty(
+                    self.num_pcs * n_buffer, dtype=self.dtype
                 )
 
                 # Compute reference distribution
-                for i in range(self.num_pcs):
-
-                    if self.divergence_metric == "intersection":
-                        # Histograms need the same bin edges so find bounds from
-                        # both windows to inform range for reference and test
-                        self.lower = min(
-                            self._reference_pca_projection.iloc[:, i].min(),
-                            self._test_pca_projection.iloc[:, i].min(),
-                        )
-
-                        self.upper = max(
-                            self._reference_pca_projection.iloc[:, i].max(),
-                            self._test_pca_projection.iloc[:, i].max(),
-                        )
-
-                        self._density_reference[f"PC{i + 1}"] = self._build_histograms(
-                            self._reference_pca_projection.iloc[:, i],
-                            bins=self.bins,
-                            bin_range=(self.lower, self.upper),
-                        )
-
-                    else:
-                        self._density_reference[f"PC{i + 1}"] = self._build_kde(
-                            self._reference_pca_projection.iloc[:, i]
-                        )
-
-        else:
-
-            # Add new obs to test window
-            if self.online_scaling is True:
-                next_obs = pd.DataFrame(self._reference_scaler.transform(X))
-            self._test_window = pd.concat([self._test_window.iloc[1:, :], next_obs])
-
-            # Project new observation onto PCs
-            next_proj = pd.DataFrame(
-                self._pca.transform(np.array(next_obs).reshape(1, -1)),
-            )
+                if self.divergence_metric == "intersection":
+                    # Histograms need the same bin edges so find per-PC bounds
+                    # from both windows to inform range for reference and test.
+                    # Incoming data is winsorized to these bounds, so they stay
+                    # fixed until the next drift. The bounds are kept on the
+                    # device, with host copies in self.lower and self.upper.
+                    self._bin_range = (
+                        xp.minimum(
+                            self._reference_pca_projection.min(axis=1),
+                            self._test_pca_projection.min(axis=1),
+                        ),
+                        xp.maximum(
+                            self._reference_pca_projection.max(axis=1),
+                            self._test_pca_projection.max(axis=1),
+                        ),
+                    )
+                    self.lower = self._to_host(self._bin_range[0])
+                    self.upper = self._to_host(self._bin_range[1])
+                    self._density_reference = self._build_histograms(
+                        self._reference_pca_projection,
+                        bins=self.bins,
+                        bin_range=self._bin_range,
+                    )
 
-            # Winsorize incoming data to align with reference and test histograms
-            if self.divergence_metric == "intersection":
-                for i in range(self.num_pcs):
-                    if next_proj.iloc[0, i] < self.lower:
-                        next_proj.iloc[0, i] = self.lower
+                else:
+                    # KDEs are compared on a per-PC grid spanning the reference
+                    # window, padded by three reference bandwidths, so the
+                    # reference KDE is built once. Test scores are winsorized
+                    # to the grid, so outliers cannot stretch it, and the test
+                    # bandwidth is limited to the padding.
+                    reference_projection = self._reference_pca_projection
+                    self._reference_bandwidth = self._bandwidth(reference_projection)
+                    self._kde_padding = 3 * self._reference_bandwidth
+                    self._bin_range = (
+                        reference_projection.min(axis=1) - self._kde_padding,
+                        reference_projection.max(axis=1) + self._kde_padding,
+                    )
+                    xp.clip(
+                        self._test_pca_projection,
+                        self._bin_range[0][:, np.newaxis],
+                        self._bin_range[1][:, np.newaxis],
+                        out=self._test_pca_projection,
+                    )
+                    self._density_reference = self._build_kde_batch(
+                        reference_projection,
+                        self._reference_bandwidth,
+                        bin_range=self._bin_range,
+                    )
 
-                    elif next_proj.iloc[0, i] > self.upper:
-                        next_proj.iloc[0, i] = self.upper
+        else:
 
-            # Add projection to test projection data
-            self._test_pca_projection = pd.concat(
-                [self._test_pca_projection.iloc[1:, :], next_proj]
-            )
+            # Hold new obs until the next change score, when they are added to
+            # the test window and projected as one batch
+            self._pending_obs.append(X)
 
             # Compute change score
             if (((self.total_samples - 1) % self.step) == 0) and (
                 (self.total_samples - 1) != 0
             ):
-                # Compute density distribution for test data
-                self._density_test = {}
-                for i in range(self.num_pcs):
-
-                    if self.divergence_metric == "intersection":
-
-                        self._density_test[f"PC{i + 1}"] = self._build_histograms(
-                            self._test_pca_projection.iloc[:, i],
-                            bins=self.bins,
-                            bin_range=(self.lower, self.upper),
-                        )
-
-                    elif self.divergence_metric == "kl":
-                        self._density_test[f"PC{i + 1}"] = self._build_kde(
-                            self._test_pca_projection.iloc[:, i]
-                        )
-
-                # Compute current score
-                change_scores = []
+                self._add_pending()
 
+                # Compute density distribution for test data and current
+                # score, the largest divergence over all PCs
                 if self.divergence_metric == "kl":
-                    for i in range(self.num_pcs):
-
-                        change_scores.append(
-                            self._jensen_shannon_distance(
-                                self._density_reference[f"PC{i + 1}"],
-                                self._density_test[f"PC{i + 1}"],
-                            )
-                        )
+                    test_bandwidth = self._xp.minimum(
+                        self._bandwidth(self._test_pca_projection), self._kde_padding
+                    )
+                    self._density_test = self._build_kde_batch(
+                        self._test_pca_projection,
+                        test_bandwidth,
+                        bin_range=self._bin_range,
+                    )
+                    change_scores = self._jensen_shannon_distance(
+                        self._density_reference, self._density_test
+                    )
 
                 elif self.divergence_metric == "intersection":
-                    for i in range(self.num_pcs):
-                        change_scores.append(
-                            self._intersection_divergence(
-                                self._density_reference[f"PC{i + 1}"],
-                                self._density_test[f"PC{i + 1}"],
-                            )
-                        )
-
-                change_score = max(change_scores)
+                    self._density_test = self._build_histograms(
+                        self._test_pca_projection,
+                        bins=self.bins,
+                        bin_range=self._bin_range,
+                    )
+                    change_scores = self._intersection_divergence(
+                        self._density_reference, self._density_test
+                    )
+
+                change_score = float(change_scores.max())
                 self._change_score.append(change_score)
 
                 self._drift_detection_monitor.update(X=change_score)
@@ -280,92 +339,341 @@ class PCACD(StreamingDetector):
         """
         super().reset()
 
-    @classmethod
-    def _build_kde(cls, sample):
-        """Compute the Kernel Density Estimate for a given 1D data stream
+    def _fit_pca(self, window):
+        """Fit the principal components of the reference window, keeping as
+        many as are needed to explain ``ev_threshold`` of its variance.
+
+        With more than 50 features and ``ev_threshold < 1``, only the leading
+        components are computed, via randomized SVD. The number computed
+        starts from the previous fit's ``num_pcs`` (or 10) and doubles until
+        ``ev_threshold`` is reached. Otherwise, the components are the leading
+        eigenvectors of the window's d x d scatter matrix, which is cheaper
+        than a full SVD of the window when ``window_size`` is much larger than
+        d. Each component's sign is fixed so that its largest loading is
+        positive.
 
         Args:
-            sample: 1D data for which we desire to estimate its density function
+            window (numpy.ndarray): reference window, one row per observation
+        """
+        self._pca_mean = window.mean(axis=0)
+        centered = window - self._pca_mean
+
+        components = None
+        if centered.shape[1] > 50 and self.ev_threshold < 1:
+            total_variance = np.sum(centered**2)
+            n_components = self.num_pcs or 10
+            while n_components < min(centered.shape):
+                _, singular_values, vt = randomized_svd(
+                    centered, n_components, random_state=0
+                )
+                ratio_cumsum = np.cumsum(singular_values**2) / total_variance
+                if ratio_cumsum[-1] > self.ev_threshold:
+                    components = vt.T
+                    break
+                n_components *= 2
+
+        if components is None:
+            # eigh returns eigenvalues in ascending order
+            eigenvalues, eigenvectors = np.linalg.eigh(centered.T @ centered)
+            eigenvalues = np.clip(eigenvalues[::-1], 0, None)
+            ratio_cumsum = np.cumsum(eigenvalues) / np.sum(eigenvalues)
+            components = eigenvectors[:, ::-1]
+
+        if self.ev_threshold < 1:
+            num_pcs = np.searchsorted(ratio_cumsum, self.ev_threshold, side="right")
+            self.num_pcs = int(min(num_pcs + 1, components.shape[1]))
+        else:
+            max_pcs = min(centered.shape)
+            if int(self.ev_threshold) > max_pcs:
+                raise ValueError(
+                    f"ev_threshold={self.ev_threshold} principal components "
+                    f"requested, but at most {max_pcs} can be fit"
+                )
+            self.num_pcs = int(self.ev_threshold)
+
+        components = components[:, : self.num_pcs]
+        max_loadings = components[
+            np.argmax(np.abs(components), axis=0), np.arange(self.num_pcs)
+        ]
+        self._pca_components_T = components * np.sign(max_loadings)
+
+    def _add_pending(self):
+        """Add the observations received since the last change score to the
+        test window, overwriting the oldest, and write their projections onto
+        the PCs, computed with a single matrix product, to the test projection.
+        Intermediate results are written to preallocated buffers.
+        """
+        # With a step longer than the window, only the most recent
+        # observations remain in the test window
+        if len(self._pending_obs) > self.window_size:
+            del self._pending_obs[: -self.window_size]
+        n_pending = len(self._pending_obs)
+        pending = self._pending_buffer[:n_pending]
+        centered = self._centered_buffer[:n_pending]
+        next_proj = self._projection_buffer[: self.num_pcs * n_pending].reshape(
+            self.num_pcs, n_pending
+        )
+
+        xp = self._xp
+        np.concatenate(self._pending_obs, out=pending)
+        np.subtract(pending, self._projection_mean, out=centered, casting="same_kind")
+        xp.matmul(self._projection_weights, xp.asarray(centered).T, out=next_proj)
+
+        # Winsorize incoming data to the reference and test density grids
+        xp.clip(
+            next_proj,
+            self._bin_range[0][:, np.newaxis],
+            self._bin_range[1][:, np.newaxis],
+            out=next_proj,
+        )
+
+        # Copy into the ring buffers, wrapping around their end at most once
+        head = self._test_head
+        n_first = min(n_pending, self.window_size - head)
+        self._test_window[head : head + n_first] = pending[:n_first]
+        self._test_pca_projection[:, head : head + n_first] = next_proj[:, :n_first]
+        self._test_window[: n_pending - n_first] = pending[n_first:]
+        self._test_pca_projection[:, : n_pending - n_first] = next_proj[:, n_first:]
+
+        self._test_head = (head + n_pending) % self.window_size
+        self._pending_obs.clear()
+
+    @staticmethod
+    def _bandwidth(sample):
+        """Silverman's rule of thumb bandwidth for each row of a sample
+
+        Args:
+            sample: 1D data, or 2D data with one row per variable, for which
+                we desire to estimate density functions
+
+        Returns:
+            Bandwidth for kernel density estimation, one per row
+
+        """
+        n_samples = sample.shape[-1]
+        return 1.06 * sample.std(axis=-1, ddof=1) * (n_samples ** (-1 / 5))
+
+    def _build_kde_batch(self, sample, bandwidth, bin_range, bins=512):
+        """Compute the Kernel Density Estimate for each row of a data window
+
+        Each row is binned onto its own evenly spaced grid, and the binned
+        rows are convolved with their Epanechnikov kernels through one
+        batched real FFT. This approximates the exact KDE at the bin centers
+        in O(bins log bins) per row rather than O(n^2). Each bandwidth is
+        rounded to a hundredth of a bin, so that kernels can be reused, and
+        is at least one bin.
+
+        Args:
+            sample: 2D data, one row per variable, for which we desire to
+                estimate each row's density function
+            bandwidth (numpy.ndarray): bandwidth of the kernel for each row
+            bin_range: (array, array) per-row lower and upper bound of the
+                grid. These should extend at least ``bandwidth`` beyond the
+                sample so no mass is lost at the edges
+            bins (int, optional): number of grid points for the binned
+                estimate. Defaults to 512.
 
         Returns:
-            Dict with density estimates for each value and KDE object
+            Dict of bin edges of the grids and corresponding density estimates,
+            with one row per variable
 
         """
-        sample_length = len(sample)
-        bandwidth = 1.06 * np.std(sample, ddof=1) * (sample_length ** (-1 / 5))
-        kde_object = KernelDensity(bandwidth=bandwidth, kernel="epanechnikov").fit(
-            sample.values.reshape(-1, 1)
+        histograms = self._build_histograms(sample, bins=bins, bin_range=bin_range)
+        bin_edges = histograms["bin_edges"]
+        bin_width = bin_edges[:, 1] - bin_edges[:, 0]
+
+        xp = self._xp
+        # A kernel narrower than a bin would be all zeros on the grid, so
+        # the bandwidth is at least one bin
+        half_width = xp.maximum(xp.round(bandwidth / bin_width, 2), 1.0)
+        kernel_fft = xp.stack(
+            [self._kernel_fft(float(h), bins) for h in self._to_host(half_width)]
         )
-        # score_samples gives log-likelihood for each point, true density values
-        # should be > 0 so exponentiate
-        density = np.exp(kde_object.score_samples(sample.values.reshape(-1, 1)))
 
-        return {"density": density, "object": kde_object}
+        density = xp.fft.irfft(
+            xp.fft.rfft(histograms["density"], n=2 * bins, axis=1) * kernel_fft,
+            n=2 * bins,
+            axis=1,
+        )[:, :bins]
+
+        # FFT convolution can leave tiny negative values where density is 0
+        density = xp.clip(density, 0, None) / (half_width * bin_width)[:, np.newaxis]
+
+        return {"bin_edges": bin_edges, "density": density}
+
+    def _kernel_fft(self, half_width, bins):
+        """Real FFT of the Epanechnikov kernel used by ``_build_kde_batch``.
+        Kernels are cached by half width and number of bins, keeping the 32
+        most recently added.
+
+        Args:
+            half_width (float): bandwidth of the kernel, in bins
+            bins (int): number of grid points for the binned estimate
+
+        Returns:
+            numpy.ndarray of the kernel's real FFT over 2 * bins points
+
+        """
+        key = (half_width, bins)
+        if key not in self._kernel_fft_cache:
+            if len(self._kernel_fft_cache) >= 32:
+                del self._kernel_fft_cache[next(iter(self._kernel_fft_cache))]
+
+            # The kernel is laid out circularly over 2 * bins points, with
+            # negative offsets wrapped to the end. As the grid spans at least
+            # two bandwidths, the kernel covers at most bins + 1 points, and
+            # zero padding the histograms to 2 * bins keeps the convolution
+            # linear.
+            offsets = np.arange(2 * bins)
+            offsets = np.where(offsets < bins, offsets, offsets - 2 * bins)
+            kernel = self._epanechnikov_kernel(offsets / half_width)
+            self._kernel_fft_cache[key] = self._xp.asarray(np.fft.rfft(kernel))
+
+        return self._kernel_fft_cache[key]
+
+    def _to_host(self, array):
+        """Copy an array from the detector's device to host memory.
+
+        Args:
+            array: numpy or cupy array
+
+        Returns:
+            numpy.ndarray
+        """
+        if self.device == "cuda":
+            return array.get()
+        return array
 
     @staticmethod
-    def _build_histograms(sample, bins, bin_range):
+    def _epanechnikov_kernel(x):
+        """Evaluate the Epanechnikov kernel elementwise.
+
+        Args:
+            x (numpy.ndarray): points, in units of bandwidth, at which to
+                evaluate the kernel
+
+        Returns:
+            numpy.ndarray of kernel values, 0 outside of [-1, 1]
+
+        """
+        x = np.asarray(x)
+        return np.where(np.abs(x) <= 1.0, 0.75 * (1.0 - x * x), 0.0)
+
+    def _build_histograms(self, sample, bins, bin_range):
         """
-        Compute the histogram density estimates for a given 1D data stream.
-        Density estimates consist of the value of the pdf in each bin,
+        Compute the histogram density estimates for each row of a data
+        window. Density estimates consist of the value of the pdf in each bin,
         normalized s.t. integral over the entire range is 1
 
+        All rows are binned at once by offsetting each row's bin indices
+        into a single ``np.bincount`` call.
+
         Args:
-            sample: 1D array in which we desire to estimate its density function
+            sample: 2D array, one row per variable, in which we desire to
+                estimate each row's density function
             bins: number of bins for estimating histograms. Equal to sqrt of
                 cardinality of ref window
-            bin_range: (float, float) lower and upper bound of histogram bins
+            bin_range: (array, array) per-row lower and upper bound of
+                histogram bins
 
         Returns:
             Dict of bin edges and corresponding density values (normalized s.t.
-            they sum to 1)
+            they sum to 1), with one row per variable
 
         """
+        xp = self._xp
+        lower, upper = xp.asarray(bin_range[0]), xp.asarray(bin_range[1])
+        n_rows = sample.shape[0]
+
+        # As in np.histogram, widen empty ranges by 0.5 on either side
+        empty = lower == upper
+        lower = xp.where(empty, lower - 0.5, lower)
+        upper = xp.where(empty, upper + 0.5, upper)
+
+        # Values on the upper bound belong to the last bin, as in np.histogram
+        scale = (bins / (upper - lower))[:, np.newaxis]
+        bin_index = xp.floor((sample - lower[:, np.newaxis]) * scale).astype(int)
+        xp.clip(bin_index, 0, bins - 1, out=bin_index)
+        bin_index += (xp.arange(n_rows) * bins)[:, np.newaxis]
+
+        counts = xp.bincount(bin_index.ravel(), minlength=n_rows * bins)
+        counts = counts.reshape(n_rows, bins)
+        bin_fractions = xp.linspace(0, 1, bins + 1)
+        bin_edges = (
+            lower[:, np.newaxis] + (upper - lower)[:, np.newaxis] * bin_fractions
+        )
 
-        density = np.histogram(sample, bins=bins, range=bin_range, density=True)
         return {
-            "bin_edges": list(density[1]),
-            "density": list(density[0] / np.sum(density[0])),
+            "bin_edges": bin_edges,
+            "density": counts / counts.sum(axis=1, keepdims=True),
         }
 
-    @classmethod
-    def _jensen_shannon_distance(cls, density_reference, density_test):
-        """Computes Jensen Shannon between two distributions
+    def _jensen_shannon_distance(self, density_reference, density_test):
+        """Computes Jensen Shannon between pairs of distributions, one pair per
+        row of the density estimates
 
         Args:
-            density_reference (dict): dictionary of density values and object
-                from ref distribution
-            density_test (dict): dictionary of density values and object from
-                test distribution
+            density_reference (dict): dictionary of density values from ref
+                distributions
+            density_test (dict): dictionary of density values from test
+                distributions
 
         Returns:
-            Change Score
+            Change scores, one per row
 
         """
-        js = jensenshannon(density_reference["density"], density_test["density"])
-        return js
+        # KDEs hold pdf values at the bin centers; normalize them to
+        # probabilities over the bins, as for the histograms
+        p = density_reference["density"]
+        q = density_test["density"]
+        p = p / p.sum(axis=1, keepdims=True)
+        q = q / q.sum(axis=1, keepdims=True)
+        m = (p + q) / 2
+
+        js = (self._kl(p, m) + self._kl(q, m)) / 2
+        return js**0.5
+
+    def _kl(self, p, q):
+        """Kullback-Leibler divergence between pairs of discrete
+        distributions, one pair per row, in one fused pass. Terms where
+        ``p`` is 0 contribute 0. ``q`` must be positive wherever ``p`` is.
+
+        Args:
+            p (numpy.ndarray): probabilities, with rows summing to 1
+            q (numpy.ndarray): probabilities, with rows summing to 1
+
+        Returns:
+            numpy.ndarray of divergences, one per row
 
-    @staticmethod
-    def _intersection_divergence(density_reference, density_test):
         """
-        Computes Intersection Area similarity between two distributions using
-        histogram density estimation method. A value of 0 means the
-        distributions are identical, a value of 1 means they are completely
-        different
+        # Where p is 0 the ratio is taken as 1, so those terms are 0 without
+        # dividing by zero
+        xp = self._xp
+        nonzero = p > 0
+        ratio = xp.where(nonzero, p, 1.0) / xp.where(nonzero, q, 1.0)
+        return (p * xp.log(ratio)).sum(axis=1)
+
+    def _intersection_divergence(self, density_reference, density_test):
+        """
+        Computes Intersection Area similarity between pairs of distributions,
+        one pair per row of the density estimates, using histogram density
+        estimation method. A value of 0 means the distributions are identical,
+        a value of 1 means they are completely different
 
         Args:
             density_reference (dict): dictionary of density values from
-                reference distribution
+                reference distributions
             density_test (dict): dictionary of density values from test
-                distribution
+                distributions
 
         Returns:
-            Change score
+            Change scores, one per row
 
         """
 
-        intersection = np.sum(
-            np.minimum(density_reference["density"], density_test["density"])
-        )
+        intersection = self._xp.minimum(
+            density_reference["density"], density_test["density"]
+        ).sum(axis=1)
         divergence = 1 - intersection
 
         return divergence
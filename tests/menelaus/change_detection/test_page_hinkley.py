@@ -63,3 +63,12 @@ def test_univariate_validation():
     input = np.array([[1, 2]])
     with pytest.raises(ValueError) as _:
         det.update(input)
+
+
+def test_float_history():
+    """Statistics histories hold plain floats, not 1x1 arrays"""
+    monitor = PageHinkley()
+    for value in [1, 2, 3]:
+        monitor.update(value)
+    assert all(isinstance(x, float) for x in monitor._change_scores)
+    assert monitor.to_dataframe()["change_scores"].dtype == np.float64
@@ -1,4 +1,8 @@
 """Methods for testing <logical flow> of PCA-CD."""
+
+import sys
+import types
+import pytest
 import pandas as pd
 import numpy as np
 from menelaus.data_drift.pca_cd import PCACD
@@ -29,9 +33,9 @@ def test_build_kl():
     for i in range(window_size):
         det.update(reference.iloc[[i]])
         reference_size += 1
-        assert len(det._reference_window) == reference_size
+        assert det._reference_fill == reference_size
         assert det.drift_state is None
-    assert len(det._test_window) == 0
+    assert det._test_fill == 0
     assert det._build_reference_and_test is True
     assert det._density_reference == {}
 
@@ -40,12 +44,12 @@ def test_build_kl():
     for i in range(window_size, window_size * 2):
         det.update(reference.iloc[[i]])
         test_size += 1
-        assert len(det._test_window) == test_size
+        assert det._test_fill == test_size
         assert det.drift_state is None
 
     # Test projection of PCs
-    assert len(det._reference_pca_projection) == reference_size
-    assert len(det._test_pca_projection) == test_size
+    assert det._reference_pca_projection.shape[1] == reference_size
+    assert det._test_pca_projection.shape[1] == test_size
 
     # Test estimation of densities
     assert det._build_reference_and_test is False
@@ -128,7 +132,7 @@ def test_kl_no_drift():
         det.update(reference.iloc[[i]])
 
         assert len(det._test_window) == window_size
-        assert len(det._test_pca_projection) == window_size
+        assert det._test_pca_projection.shape[1] == window_size
 
         update_size += 1
         if (window_size * 2 + update_size) % step == 0:
@@ -178,7 +182,7 @@ def test_kl_drift():
         det.update(drift.iloc[[i]])
 
         assert len(det._test_window) == window_size
-        assert len(det._test_pca_projection) == window_size
+        assert det._test_pca_projection.shape[1] == window_size
 
         update_size += 1
         if (window_size * 2 + update_size) % step == 0:
@@ -191,6 +195,49 @@ def test_kl_drift():
     assert det.drift_state is not None
 
 
+def test_kl_drift_no_online_scaling():
+    """
+    For KL with drift and online_scaling=False: tests unscaled streaming
+    projection and detection of drift
+    """
+
+    # Setup data
+    np.random.seed(1)
+    size = 150
+    col1 = np.random.randint(1, 10, size)
+    col2 = np.random.uniform(1, 2, size)
+    col3 = np.random.normal(0, 1, size)
+    reference = pd.DataFrame(data=[col1, col2, col3]).T
+
+    # adding drift
+    col1_ = np.random.uniform(9, 10, size)
+    col2_ = np.random.normal(1, 3, size)
+    col3_ = np.random.randint(20, 30, size)
+    drift = pd.DataFrame(data=[col1_, col2_, col3_]).T
+
+    # Setup detector
+    window_size = 50
+    det = PCACD(window_size=window_size, divergence_metric="kl", online_scaling=False)
+
+    # Update with reference distribution
+    for i in range(len(reference)):
+        det.update(reference.iloc[[i]])
+
+        # Once fit, projections are of the unscaled windows
+        if i == 2 * window_size - 1:
+            expected = (det._reference_window - det._pca_mean) @ det._pca_components_T
+            assert np.allclose(det._reference_pca_projection, expected.T)
+    assert det._drift_state is None
+
+    # Update with drifted distribution
+    for i in range(len(drift)):
+        det.update(drift.iloc[[i]])
+        if det.drift_state is not None:
+            break
+
+    assert det.drift_state is not None
+
+
 def test_build_intersection():
     """
     For intersection: tests setup and density estimation
@@ -225,6 +272,11 @@ def test_build_intersection():
     assert det._build_reference_and_test is False
     assert det._density_reference != {}
 
+    # Test per-PC histogram bounds
+    assert len(det.lower) == det.num_pcs
+    assert len(det.upper) == det.num_pcs
+    assert np.all(det.lower < det.upper)
+
 
 def test_intersection_no_drift():
     """
@@ -258,7 +310,7 @@ def test_intersection_no_drift():
         det.update(reference.iloc[[i]])
 
         assert len(det._test_window) == window_size
-        assert len(det._test_pca_projection) == window_size
+        assert det._test_pca_projection.shape[1] == window_size
 
         update_size += 1
         if (window_size * 2 + update_size) % step == 0:
@@ -306,7 +358,7 @@ def test_intersection_drift():
         det.update(drift.iloc[[i]])
 
         assert len(det._test_window) == window_size
-        assert len(det._test_pca_projection) == window_size
+        assert det._test_pca_projection.shape[1] == window_size
 
         update_size += 1
         if (window_size * 2 + update_size) % step == 0:
@@ -317,3 +369,378 @@ def test_intersection_drift():
             break
 
     assert det.drift_state is not None
+
+
+def test_build_kde_binned():
+    """
+    Tests binned KDE against the exact Epanechnikov KDE from scikit-learn
+    """
+    from sklearn.neighbors import KernelDensity
+
+    np.random.seed(1)
+    sample = np.vstack([np.random.normal(0, 1, 500), np.random.uniform(-5, 5, 500)])
+    bandwidth = PCACD._bandwidth(sample)
+    bin_range = (sample.min(axis=1) - bandwidth, sample.max(axis=1) + bandwidth)
+    det = PCACD(window_size=500)
+    kde = det._build_kde_batch(sample, bandwidth, bin_range=bin_range)
+
+    assert kde["density"].shape == (2, 512)
+    assert kde["bin_edges"].shape == (2, 513)
+    for i in range(2):
+        bin_centers = (kde["bin_edges"][i, :-1] + kde["bin_edges"][i, 1:]) / 2
+        exact = KernelDensity(bandwidth=bandwidth[i], kernel="epanechnikov").fit(
+            sample[i, :, np.newaxis]
+        )
+        expected = np.exp(exact.score_samples(bin_centers.reshape(-1, 1)))
+        assert np.allclose(kde["density"][i], expected, atol=0.01)
+
+
+def test_epanechnikov_kernel():
+    """
+    Tests vectorized Epanechnikov kernel, including support boundaries
+    """
+    x = np.array([-2.0, -1.0, -0.5, 0.0, 0.5, 1.0, 2.0])
+    expected = np.array([0.0, 0.0, 0.5625, 0.75, 0.5625, 0.0, 0.0])
+    assert np.allclose(PCACD._epanechnikov_kernel(x), expected)
+
+
+def test_fit_pca():
+    """
+    Tests principal components against scikit-learn's PCA, up to sign
+    """
+    from sklearn.decomposition import PCA
+
+    np.random.seed(1)
+    window = np.random.normal(0, 1, (200, 5)) @ np.random.uniform(0, 1, (5, 5))
+
+    det = PCACD(window_size=200, ev_threshold=0.9)
+    det._fit_pca(window)
+    expected = PCA(0.9).fit(window)
+
+    assert det.num_pcs == len(expected.components_)
+    assert np.allclose(det._pca_mean, expected.mean_)
+    assert np.allclose(
+        np.abs(det._pca_components_T), np.abs(expected.components_.T), atol=1e-6
+    )
+
+
+def test_fit_pca_num_pcs():
+    """
+    Tests an integer ev_threshold keeps that many principal components, and
+    that more than the number of features is rejected
+    """
+    np.random.seed(1)
+    window = np.random.normal(0, 1, (100, 3))
+
+    det = PCACD(window_size=100, ev_threshold=2)
+    det._fit_pca(window)
+    assert det.num_pcs == 2
+    assert det._pca_components_T.shape == (3, 2)
+
+    det = PCACD(window_size=100, ev_threshold=5)
+    with pytest.raises(ValueError):
+        det._fit_pca(window)
+
+
+def test_build_histograms():
+    """
+    Tests histograms built for all rows at once against np.histogram
+    """
+    np.random.seed(1)
+    sample = np.random.normal(0, 1, (3, 100))
+    sample[2] = 1.0
+    lower, upper = sample.min(axis=1), sample.max(axis=1)
+    det = PCACD(window_size=50)
+    histograms = det._build_histograms(sample, bins=10, bin_range=(lower, upper))
+
+    assert histograms["density"].shape == (3, 10)
+    assert histograms["bin_edges"].shape == (3, 11)
+    for i in range(3):
+        counts, edges = np.histogram(sample[i], bins=10, range=(lower[i], upper[i]))
+        assert np.allclose(histograms["density"][i], counts / counts.sum())
+        assert np.allclose(histograms["bin_edges"][i], edges)
+
+
+def test_fit_pca_randomized():
+    """
+    Tests randomized principal components for many features against
+    scikit-learn's PCA, up to sign
+    """
+    from sklearn.decomposition import PCA
+
+    np.random.seed(1)
+    latent = np.random.normal(0, 1, (500, 15)) * np.linspace(10, 1, 15)
+    window = latent @ np.random.normal(0, 1, (15, 80))
+    window += np.random.normal(0, 0.01, window.shape)
+
+    det = PCACD(window_size=500, ev_threshold=0.99)
+    det._fit_pca(window)
+    expected = PCA(0.99).fit(window)
+
+    assert det.num_pcs == len(expected.components_)
+    assert np.allclose(
+        np.abs(det._pca_components_T), np.abs(expected.components_.T), atol=1e-4
+    )
+
+
+def test_float32():
+    """
+    For float32: tests streaming buffers use the requested dtype, and drift is
+    still detected
+    """
+
+    # Setup data
+    np.random.seed(1)
+    size = 150
+    col1 = np.random.randint(1, 10, size)
+    col2 = np.random.uniform(1, 2, size)
+    col3 = np.random.normal(0, 1, size)
+    reference = pd.DataFrame(data=[col1, col2, col3]).T
+
+    # adding drift
+    col1_ = np.random.uniform(9, 10, size)
+    col2_ = np.random.normal(1, 3, size)
+    col3_ = np.random.randint(20, 30, size)
+    drift = pd.DataFrame(data=[col1_, col2_, col3_]).T
+
+    # Setup detector
+    window_size = 50
+    det = PCACD(window_size=window_size, delta=0.05, dtype="float32")
+
+    # Update with reference distribution
+    for i in range(len(reference)):
+        det.update(reference.iloc[[i]])
+    assert det._drift_state is None
+    assert det._test_window.dtype == np.float64
+    assert det._test_pca_projection.dtype == np.float32
+    assert det._reference_pca_projection.dtype == np.float32
+
+    # Update with drifted distribution
+    for i in range(len(drift)):
+        det.update(drift.iloc[[i]])
+        if det.drift_state is not None:
+            break
+
+    assert det.drift_state is not None
+
+
+def test_float32_large_mean():
+    """
+    For float32: tests the windows of data with a large mean are kept exactly,
+    and projections are centered before the cast, so they match the float64
+    projection
+    """
+    np.random.seed(0)
+    data = np.random.normal(0, 1, (500, 3)) @ np.random.uniform(0, 1, (3, 3))
+    data = pd.DataFrame(data + 1e5)
+
+    det = PCACD(window_size=200, dtype="float32")
+    for i in range(len(data)):
+        det.update(data.iloc[[i]])
+
+    def project(window):
+        scaler = det._reference_scaler
+        centered = (window - scaler.mean_) / scaler.scale_ - det._pca_mean
+        return (centered @ det._pca_components_T).T
+
+    assert np.allclose(
+        det._reference_pca_projection, project(det._reference_window), atol=1e-4
+    )
+
+    # The last change score came with the 491st observation
+    test_window = data.values[291:491]
+    assert det.drift_state is None
+    assert np.array_equal(
+        np.roll(det._test_window, -det._test_head, axis=0), test_window
+    )
+
+    # Test scores are winsorized to the KDE grid
+    expected = np.clip(
+        project(det._test_window),
+        det._bin_range[0][:, np.newaxis],
+        det._bin_range[1][:, np.newaxis],
+    )
+    assert np.allclose(det._test_pca_projection, expected, atol=1e-4)
+
+
+def test_kernel_fft_cache():
+    """
+    Tests kernel FFTs are reused, and the cache is bounded
+    """
+    det = PCACD(window_size=50)
+    kernel_fft = det._kernel_fft(10.0, 512)
+    assert det._kernel_fft(10.0, 512) is kernel_fft
+    assert len(kernel_fft) == 513
+
+    for i in range(40):
+        det._kernel_fft(1.0 + i, 512)
+    assert len(det._kernel_fft_cache) == 32
+    assert (10.0, 512) not in det._kernel_fft_cache
+
+
+def test_invalid_device():
+    """
+    Tests an unknown device is rejected
+    """
+    with pytest.raises(ValueError):
+        PCACD(window_size=50, device="gpu")
+
+
+def test_jensen_shannon_distance():
+    """
+    Tests Jensen-Shannon distance for all rows at once against scipy
+    """
+    from scipy.spatial.distance import jensenshannon
+
+    np.random.seed(1)
+    reference = np.random.uniform(0, 1, (3, 20))
+    test = np.random.uniform(0, 1, (3, 20))
+    reference[0, :5] = 0
+    test[1, 5:10] = 0
+    test[2] = reference[2]
+
+    det = PCACD(window_size=50)
+    js = det._jensen_shannon_distance({"density": reference}, {"density": test})
+    assert np.allclose(js, jensenshannon(reference, test, axis=1))
+    assert np.isclose(js[2], 0)
+
+
+def test_kl_outlier_finite():
+    """
+    Tests a single extreme outlier does not produce NaN change scores for KL
+    """
+    np.random.seed(0)
+    data = np.random.normal(0, 1, (1000, 3))
+    data[500] = 1e5
+    data = pd.DataFrame(data)
+
+    det = PCACD(window_size=200, divergence_metric="kl")
+    for i in range(len(data)):
+        det.update(data.iloc[[i]])
+
+    assert np.all(np.isfinite(det._change_score))
+
+
+def test_kl_outlier_no_drift():
+    """
+    Tests a single extreme outlier, in the reference or the test window, does
+    not stretch the KDE grid into a false drift
+    """
+    for outlier in [100, 500]:
+        np.random.seed(0)
+        data = np.random.normal(0, 1, (1000, 3))
+        data[outlier] = 1e5
+        data = pd.DataFrame(data)
+
+        det = PCACD(window_size=200, divergence_metric="kl")
+        for i in range(len(data)):
+            det.update(data.iloc[[i]])
+            assert det.drift_state is None
+
+
+def test_kl_reference_built_once():
+    """
+    Tests the reference KDE and its grid are built once at fit time, and test
+    scores are winsorized to the grid
+    """
+    np.random.seed(0)
+    data = pd.DataFrame(np.random.normal(0, 1, (400, 3)))
+
+    det = PCACD(window_size=100, divergence_metric="kl")
+    for i in range(200):
+        det.update(data.iloc[[i]])
+    density_reference = det._density_reference
+    lower, upper = det._bin_range
+
+    for i in range(200, len(data)):
+        det.update(data.iloc[[i]])
+    assert det.drift_state is None
+    assert det._density_reference is density_reference
+    assert np.all(det._test_pca_projection >= lower[:, np.newaxis])
+    assert np.all(det._test_pca_projection <= upper[:, np.newaxis])
+    assert np.array_equal(
+        det._density_test["bin_edges"], density_reference["bin_edges"]
+    )
+
+
+def test_step_longer_than_window():
+    """
+    Tests a step longer than the window keeps only the most recent
+    observations in the test window
+    """
+    np.random.seed(0)
+    data = pd.DataFrame(np.random.normal(0, 1, (300, 3)))
+
+    det = PCACD(window_size=40, sample_period=2)
+    assert det.step > det.window_size
+    for i in range(len(data)):
+        det.update(data.iloc[[i]])
+
+    # The last change score came with the 241st observation
+    expected = data.values[201:241]
+    assert np.allclose(np.roll(det._test_window, -det._test_head, axis=0), expected)
+    assert det._test_pca_projection.shape[1] == det.window_size
+
+
+class _DeviceArray(np.ndarray):
+    """Stands in for a cupy array, which must be copied to the host with get()"""
+
+    def get(self):
+        return self.view(np.ndarray)
+
+
+def _fake_cupy():
+    """A stand-in cupy module: numpy, with every array it returns on the
+    "device" as a _DeviceArray"""
+
+    def on_device(function):
+        def wrapped(*args, **kwargs):
+            result = function(*args, **kwargs)
+            if isinstance(result, np.ndarray):
+                result = result.view(_DeviceArray)
+            return result
+
+        return wrapped
+
+    module = types.ModuleType("cupy")
+    module.__getattr__ = lambda name: on_device(getattr(np, name))
+    module.fft = types.SimpleNamespace(
+        rfft=on_device(np.fft.rfft), irfft=on_device(np.fft.irfft)
+    )
+    return module
+
+
+@pytest.mark.parametrize("divergence_metric", ["kl", "intersection"])
+def test_cuda_device(monkeypatch, divergence_metric):
+    """
+    Tests the "cuda" device path against the CPU, with a stand-in for cupy
+    """
+    monkeypatch.setitem(sys.modules, "cupy", _fake_cupy())
+
+    np.random.seed(1)
+    data = np.random.normal(0, 1, (400, 3))
+    data[250:] += [5, 0, -5]
+    data = pd.DataFrame(data)
+
+    detectors = {
+        device: PCACD(
+            window_size=50, divergence_metric=divergence_metric, device=device
+        )
+        for device in ["cpu", "cuda"]
+    }
+    drift = {device: [] for device in detectors}
+    for i in range(len(data)):
+        for device, det in detectors.items():
+            det.update(data.iloc[[i]])
+            if det.drift_state is not None:
+                drift[device].append(i)
+
+    cpu, cuda = detectors["cpu"], detectors["cuda"]
+    assert isinstance(cuda._test_pca_projection, _DeviceArray)
+    assert drift["cuda"] == drift["cpu"]
+    assert len(drift["cuda"]) > 0
+    assert np.allclose(cuda._change_score, cpu._change_score)
+    assert all(type(score) is float for score in cuda._change_score[1:])
+    if divergence_metric == "intersection":
+        assert type(cuda.lower) is np.ndarray
+        assert type(cuda.upper) is np.ndarray